@@ -3,7 +3,6 @@ from dataclasses import dataclass
 from typing import Optional, Tuple
 import cv2
 import numpy as np
-import math
 
 try:
     import mediapipe as mp
@@ -14,15 +13,20 @@ except Exception:
 # 6포인트 EAR 계산 (dlib 방식)
 LEFT_EYE_6  = [33, 160, 158, 133, 153, 144]
 RIGHT_EYE_6 = [263, 387, 385, 362, 380, 373]
+LEFT_EYE_6_ARR  = np.array(LEFT_EYE_6, np.int32)
+RIGHT_EYE_6_ARR = np.array(RIGHT_EYE_6, np.int32)
 
-def _dist(p, q):
-    return math.hypot(p[0]-q[0], p[1]-q[1])
+def landmarks_to_array(lms) -> np.ndarray:
+    """FaceMesh landmark 목록 → 정규화 좌표 (N, 2) float32 배열."""
+    return np.fromiter((c for lm in lms for c in (lm.x, lm.y)),
+                       dtype=np.float32, count=len(lms) * 2).reshape(-1, 2)
 
-def eye_aspect_ratio(pts6):
-    p1, p2, p3, p4, p5, p6 = pts6
-    num = _dist(p2, p6) + _dist(p3, p5)
-    den = 2.0 * _dist(p1, p4)
-    return (num / den) if den > 1e-6 else 0.0
+def eye_aspect_ratio(pts6) -> float:
+    """(6, 2) 눈 좌표 배열에서 EAR 계산."""
+    p = np.asarray(pts6, dtype=np.float32)
+    num = np.linalg.norm(p[1] - p[5]) + np.linalg.norm(p[2] - p[4])
+    den = 2.0 * np.linalg.norm(p[0] - p[3])
+    return float(num / den) if den > 1e-6 else 0.0
 
 @dataclass
 class DrowsyState:
@@ -56,72 +60,193 @@ class DrowsyMonitor:
 
         return turned_on, turned_off
 
+    def update_batch(self, ears: np.ndarray, thresh: float) -> tuple[np.ndarray, np.ndarray]:
+        """
+        update()를 EAR 시퀀스 전체에 적용한 것과 동일한 결과를 벡터 연산으로 계산 (로그 재생 / 임계값 튜닝용).
+        현재 state에서 이어서 진행하고 마지막 state를 반영한다.
+        Returns (turned_on_mask, turned_off_mask) — 각 프레임별 bool 배열.
+        """
+        ears = np.asarray(ears, dtype=np.float64).ravel()  # update()와 같은 정밀도로 비교
+        n = ears.size
+        if n == 0:
+            return np.zeros(0, bool), np.zeros(0, bool)
+
+        below = (ears > 0) & (ears < thresh)
+        # 연속 below 길이: 마지막 reset(below=False) 위치로부터의 거리
+        idx = np.arange(n)
+        last_reset = np.maximum.accumulate(np.where(below, -1, idx))
+        count = np.where(below, idx - last_reset, 0)
+        lead = last_reset < 0  # 첫 reset 이전 구간은 기존 카운터에 이어서 센다
+        count[lead] += self.state.below_counter
+
+        active = count >= self.frames_thresh
+        if self.state.active:
+            active[lead] = True
+        prev_active = np.concatenate(([self.state.active], active[:-1]))
+
+        turned_on = active & ~prev_active
+        turned_off = ~below & prev_active
+
+        self.state.below_counter = int(count[-1])
+        self.state.active = bool(active[-1])
+        return turned_on, turned_off
+
     def is_active(self) -> bool:
         return self.state.active
 
 class FaceMeshDetector:
-    """MediaPipe FaceMesh로 EAR 계산 & 오버레이 생성."""
-    def __init__(self):
+    """
+    MediaPipe FaceMesh로 EAR 계산 & 오버레이 생성.
+    EAR 6포인트는 기본 468 landmark에 포함되므로 iris refine 모델은 기본으로 끈다
+    (iris 오버레이가 필요할 때만 refine_landmarks=True).
+    """
+    def __init__(self, refine_landmarks: bool = False):
         self.mesh = None
         if MP_OK:
             self.mp_face_mesh = mp.solutions.face_mesh
             self.mesh = self.mp_face_mesh.FaceMesh(
                 max_num_faces=1,
-                refine_landmarks=True,
+                refine_landmarks=refine_landmarks,
                 min_detection_confidence=0.5,
                 min_tracking_confidence=0.5,
             )
 
+        # ROI 추론: 이전 프레임 bbox 주변만 잘라서 FaceMesh에 입력 (O(HW) 비용 절감)
+        self.roi_enabled = True
+        self.roi_scale = 1.5        # bbox 대비 ROI 한 변 배율
+        self.roi_max_miss = 3       # ROI에서 연속 실패가 이 값을 넘으면 전체 프레임으로 복귀
+        self._last_bbox: Optional[Tuple[int, int, int, int]] = None
+        self._miss_counter = 0
+
+        # 시간축 subsampling: detect_every 프레임마다 한 번만 FaceMesh 실행,
+        # 나머지 프레임은 직전 두 검출 결과로 선형 외삽한 landmark를 사용
+        self.detect_every = 2
+        self._frame_idx = 0
+        self._prev_lms: Optional[np.ndarray] = None
+        self._cur_lms: Optional[np.ndarray] = None
+
+        # fallback 프레임으로만 검출되는 동안(엣지 모드 등)은 fallback을 먼저 시도하고,
+        # primary_retry_every 번마다 한 번씩 원래 프레임을 먼저 다시 시도한다.
+        self.primary_retry_every = 10
+        self._fallback_streak = 0
+
+        # RGB 변환 버퍼 (ROI 크기가 매 프레임 달라지므로 평탄 버퍼를 잡고 앞부분을 view로 사용)
+        self._rgb_buf = np.empty(0, np.uint8)
+
     def close(self):
         if self.mesh:
             self.mesh.close()
 
-    def detect(self, bgr) -> Optional[object]:
-        """bgr 프레임에서 landmarks 탐지 결과 반환."""
+    def track(self, bgr, fallback=None) -> Optional[np.ndarray]:
+        """
+        프레임마다 호출. 검출 프레임이면 detect()를 실행하고(실패 시 fallback 프레임으로 재시도),
+        건너뛰는 프레임이면 외삽한 landmark를 반환. 결과는 정규화 (N, 2) 배열 또는 None.
+        """
+        idx = self._frame_idx
+        self._frame_idx += 1
+        j = idx % self.detect_every
+        if j != 0 and self._cur_lms is not None:
+            if self._prev_lms is None:
+                return self._cur_lms
+            return self._cur_lms + (j / self.detect_every) * (self._cur_lms - self._prev_lms)
+
+        order = [bgr] if fallback is None else [bgr, fallback]
+        if fallback is not None and self._fallback_streak % self.primary_retry_every:
+            order.reverse()
+        lms, src = None, None
+        for src in order:
+            lms = self.detect(src)
+            if lms is not None:
+                break
+        if lms is not None and src is fallback:
+            self._fallback_streak += 1
+        else:
+            self._fallback_streak = 0
+        self._prev_lms, self._cur_lms = self._cur_lms, lms
+        return lms
+
+    def detect(self, bgr) -> Optional[np.ndarray]:
+        """bgr(또는 GRAY) 프레임에서 첫 얼굴의 정규화 landmark (N, 2) 배열 반환. 없으면 None."""
         if not self.mesh:
             return None
-        rgb = cv2.cvtColor(bgr, cv2.COLOR_BGR2RGB)
-        return self.mesh.process(rgb)
+        h, w = bgr.shape[:2]
+        roi = self._roi_rect(w, h) if self.roi_enabled and self._last_bbox else None
+        src = bgr if roi is None else bgr[roi[1]:roi[3], roi[0]:roi[2]]
+
+        code = cv2.COLOR_GRAY2RGB if src.ndim == 2 else cv2.COLOR_BGR2RGB
+        rh, rw = src.shape[:2]
+        if self._rgb_buf.size < rh * rw * 3:
+            self._rgb_buf = np.empty(rh * rw * 3, np.uint8)
+        rgb = cv2.cvtColor(src, code, dst=self._rgb_buf[:rh * rw * 3].reshape(rh, rw, 3))
+        results = self.mesh.process(rgb)
+
+        if not (results and results.multi_face_landmarks):
+            if roi is None:
+                self._last_bbox = None
+            else:
+                self._miss_counter += 1
+                if self._miss_counter > self.roi_max_miss:
+                    self._last_bbox = None
+            return None
+
+        lms = landmarks_to_array(results.multi_face_landmarks[0].landmark)
+        if roi is not None:
+            # ROI 정규화 좌표 → 전체 프레임 정규화 좌표
+            x1, y1, x2, y2 = roi
+            lms[:, 0] = (lms[:, 0] * (x2 - x1) + x1) / w
+            lms[:, 1] = (lms[:, 1] * (y2 - y1) + y1) / h
+
+        (mx, my), (Mx, My) = lms.min(0) * (w, h), lms.max(0) * (w, h)
+        self._last_bbox = (int(mx), int(my), int(Mx), int(My))
+        self._miss_counter = 0
+        return lms
+
+    def _roi_rect(self, w: int, h: int) -> Optional[Tuple[int, int, int, int]]:
+        """_last_bbox를 roi_scale배 확장한 정사각 ROI (프레임 경계로 clamp)."""
+        bx1, by1, bx2, by2 = self._last_bbox
+        side = max(bx2 - bx1, by2 - by1) * self.roi_scale
+        cx, cy = (bx1 + bx2) / 2.0, (by1 + by2) / 2.0
+        x1, y1 = max(0, int(cx - side / 2)), max(0, int(cy - side / 2))
+        x2, y2 = min(w, int(cx + side / 2)), min(h, int(cy + side / 2))
+        if x2 - x1 < 16 or y2 - y1 < 16:
+            return None
+        return x1, y1, x2, y2
 
     def draw_overlays(
         self,
-        results,
+        landmarks: Optional[np.ndarray],
         canvas: np.ndarray,
         draw_eye_outline: bool = True,
         draw_bbox: bool = True,
         draw_label: bool = True,
         ear_digits: int = 2,
     ) -> Tuple[np.ndarray, float, Optional[Tuple[int,int,int,int]]]:
-        """이미 계산된 results로 캔버스에 그리기 + EAR 반환."""
+        """정규화 landmark (N, 2) 배열로 캔버스에 그리기 + EAR 반환."""
         h, w = canvas.shape[:2]
         ear_val = 0.0
         bbox = None
 
-        if not (results and results.multi_face_landmarks):
+        if landmarks is None:
             return canvas, ear_val, bbox
 
-        lms = results.multi_face_landmarks[0].landmark
-
-        def px(idx):
-            return (int(lms[idx].x * w), int(lms[idx].y * h))
+        pts = landmarks * np.array([w, h], np.float32)
 
-        L = [px(i) for i in LEFT_EYE_6]
-        R = [px(i) for i in RIGHT_EYE_6]
+        L = pts[LEFT_EYE_6_ARR]
+        R = pts[RIGHT_EYE_6_ARR]
         ear_left  = eye_aspect_ratio(L)
         ear_right = eye_aspect_ratio(R)
         ear_val = (ear_left + ear_right) / 2.0
 
         if draw_eye_outline:
-            ptsL = np.array(L + [L[0]], np.int32).reshape(-1, 1, 2)
-            ptsR = np.array(R + [R[0]], np.int32).reshape(-1, 1, 2)
-            cv2.polylines(canvas, [ptsL], False, (255, 0, 0), 2, cv2.LINE_AA)
-            cv2.polylines(canvas, [ptsR], False, (255, 0, 0), 2, cv2.LINE_AA)
+            # 양쪽 눈을 한 번의 polylines 호출로 (isClosed=True로 첫 점 복제 생략)
+            ptsL = L.astype(np.int32).reshape(-1, 1, 2)
+            ptsR = R.astype(np.int32).reshape(-1, 1, 2)
+            cv2.polylines(canvas, [ptsL, ptsR], True, (255, 0, 0), 2, cv2.LINE_AA)
 
         if draw_bbox:
-            xs = [int(l.x * w) for l in lms]
-            ys = [int(l.y * h) for l in lms]
-            x1, y1 = max(0, min(xs)), max(0, min(ys))
-            x2, y2 = min(w - 1, max(xs)), min(h - 1, max(ys))
+            (mx, my), (Mx, My) = pts.min(0).astype(np.int32), pts.max(0).astype(np.int32)
+            x1, y1 = max(0, int(mx)), max(0, int(my))
+            x2, y2 = min(w - 1, int(Mx)), min(h - 1, int(My))
             bbox = (x1, y1, x2, y2)
             cv2.rectangle(canvas, (x1, y1), (x2, y2), (0, 255, 0), 2)
 
@@ -1,5 +1,6 @@
 from __future__ import annotations
-from typing import List, Optional
+from typing import Optional
+import io, warnings
 import numpy as np
 import cv2
 from PySide6.QtCore import Signal
@@ -47,19 +48,22 @@ class KernelEditorDialog(QDialog):
         s = self.text.toPlainText().strip()
         if not s:
             return None
-        rows = [r for r in s.splitlines() if r.strip()]
-        data: List[List[float]] = []
-        for r in rows:
-            parts = r.replace(",", " ").split()
-            data.append([float(x) for x in parts])
-        widths = {len(r) for r in data}
-        if len(widths) != 1:
-            raise ValueError("모든 행의 열 개수가 같아야 합니다.")
-        ker = np.array(data, dtype=np.float32)
+        # np.loadtxt로 C 레벨에서 한 번에 파싱 (빈 줄은 무시, 열 개수가 다르면 ValueError)
+        # comments=None: '#'도 숫자가 아니므로 파싱 오류로 처리
+        msg = "모든 행의 열 개수가 같은 숫자 행렬이어야 합니다."
+        try:
+            with warnings.catch_warnings():
+                warnings.simplefilter("ignore", UserWarning)  # 빈 입력 경고 → 아래에서 ValueError
+                ker = np.loadtxt(io.StringIO(s.replace(",", " ")), dtype=np.float32,
+                                 ndmin=2, comments=None)
+        except ValueError as e:
+            raise ValueError(f"{msg}\n({e})") from e
+        if ker.size == 0:
+            raise ValueError(msg)
         if self.chk_norm.isChecked():
             sm = ker.sum()
             if abs(sm) > 1e-6:
-                ker = ker / sm
+                ker /= sm
         return ker
 
     def on_preview(self):
@@ -1,9 +1,9 @@
 from __future__ import annotations
 from typing import Optional
-import os, time
+import os, time, queue
 import cv2
 import numpy as np
-from PySide6.QtCore import Qt, QTimer, QSize
+from PySide6.QtCore import Qt, QSize
 from PySide6.QtGui import QPixmap, QAction
 from PySide6.QtWidgets import (
     QMainWindow, QWidget, QLabel, QHBoxLayout, QVBoxLayout,
@@ -15,6 +15,7 @@ from src.utils import bgr_to_qimage
 from src.processor import VideoProcessor
 from src.detection import FaceMeshDetector, DrowsyMonitor
 from src.kernel_editor import KernelEditorDialog
+from src.pipeline import CaptureWorker, ProcessWorker
 
 class MainWindow(QMainWindow):
     def __init__(self):
@@ -23,23 +24,34 @@ class MainWindow(QMainWindow):
         self.setMinimumSize(QSize(1280, 720))
 
         # Runtime
-        self.cap: Optional[cv2.VideoCapture] = None
-        self.timer = QTimer(self); self.timer.timeout.connect(self.on_timer)
         self.mode_image = False
         self.loaded_image: Optional[np.ndarray] = None
+        self.last_frame: Optional[np.ndarray] = None
+        self._preview_bufs: dict = {}  # QLabel -> 재사용하는 축소 버퍼
 
         # Modules
         self.processor = VideoProcessor()
         self.detector = FaceMeshDetector()
         self.drowsy = DrowsyMonitor(frames_thresh=15)
 
+        # Pipeline: CaptureWorker -(queue, drop-oldest)-> ProcessWorker -(signal)-> GUI
+        self.frames: queue.Queue = queue.Queue(maxsize=2)
+        self.capture = CaptureWorker(self.frames)
+        self.worker = ProcessWorker(self.frames, self.processor, self.detector, self.drowsy)
+        self.worker.frame_ready.connect(self._on_frame_ready, Qt.ConnectionType.QueuedConnection)
+        self.worker.log_message.connect(self._log, Qt.ConnectionType.QueuedConnection)
+
         # Log file
         self.log_path = os.path.abspath("drowsy_log.txt")
+        self._log_closed = False
+        self._log_f = self._open_log_file()  # 라인 버퍼링 핸들
 
         # UI build
         self._build_ui()
+        self._sync_settings()
         self._open_camera(0)
-        self.timer.start(30)
+        self.worker.start()
+        self.capture.start()
         self._log(f"▶ Session started at {time.strftime('%Y-%m-%d %H:%M:%S')}")
 
     # ---------- UI ----------
@@ -112,6 +124,10 @@ class MainWindow(QMainWindow):
 
         # Color/CLAHE/Blur
         self.combo_color = QComboBox(); self.combo_color.addItems(["BGR", "Grayscale"])
+        self.chk_umat = QCheckBox("Use OpenCL (UMat)")
+        self.chk_umat.setEnabled(cv2.ocl.haveOpenCL())
+        if not cv2.ocl.haveOpenCL():
+            self.chk_umat.setToolTip("OpenCL을 사용할 수 없는 환경입니다.")
         self.chk_clahe = QCheckBox("CLAHE")
         self.sld_clahe = QSlider(Qt.Orientation.Horizontal); self.sld_clahe.setRange(10,80); self.sld_clahe.setValue(20)
 
@@ -138,7 +154,7 @@ class MainWindow(QMainWindow):
         # Layout rows
         hsrc = self._hrow(self.combo_source, self.btn_load, QLabel("Camera"), self.combo_cam)
         f.addRow("Source", hsrc)
-        f.addRow("Color", self.combo_color)
+        f.addRow("Color", self._hrow(self.combo_color, self.chk_umat))
         f.addRow("CLAHE", self._hrow(self.chk_clahe, self.sld_clahe))
         f.addRow("Blur", self._hrow(self.combo_blur, self.sld_blur))
         f.addRow("Edge/Sharpen", self.combo_edge)
@@ -147,6 +163,14 @@ class MainWindow(QMainWindow):
         f.addRow("Drowsy", self._hrow(QLabel("EAR thresh"), self.sld_ear, QLabel("digits"), self.spn_ear_digits))
         f.addRow("", self.chk_alarm)
 
+        # 설정 변경 시 워커에 반영 (위젯은 GUI 스레드에서만 읽는다)
+        for cb in (self.combo_color, self.combo_blur, self.combo_edge):
+            cb.currentIndexChanged.connect(self._sync_settings)
+        for sl in (self.sld_clahe, self.sld_blur, self.sld_intensity, self.sld_ear, self.spn_ear_digits):
+            sl.valueChanged.connect(self._sync_settings)
+        for chk in (self.chk_umat, self.chk_clahe, self.chk_detect, self.chk_eye_outline, self.chk_bbox, self.chk_label, self.chk_alarm):
+            chk.toggled.connect(self._sync_settings)
+
         box.setLayout(f)
         return box
 
@@ -157,10 +181,34 @@ class MainWindow(QMainWindow):
             h.addWidget(x)
         return w
 
+    def _sync_settings(self, *_):
+        # sync processor with UI
+        self.processor.color_mode = self.combo_color.currentText()
+        self.processor.clahe_enabled = self.chk_clahe.isChecked()
+        self.processor.clahe_clip = self.sld_clahe.value() / 10.0
+        self.processor.blur_kind = self.combo_blur.currentText()
+        self.processor.blur_level = self.sld_blur.value()
+        self.processor.edge_kind = self.combo_edge.currentText()
+        self.processor.intensity = self.sld_intensity.value() / 100.0
+        self.processor.use_umat = self.chk_umat.isChecked()
+
+        # sync detection / alarm options
+        self.worker.detect_enabled = self.chk_detect.isChecked()
+        self.worker.draw_eye_outline = self.chk_eye_outline.isChecked()
+        self.worker.draw_bbox = self.chk_bbox.isChecked()
+        self.worker.draw_label = self.chk_label.isChecked()
+        self.worker.ear_digits = self.spn_ear_digits.value()
+        self.worker.alarm_enabled = self.chk_alarm.isChecked()
+        self.worker.ear_thresh = self.sld_ear.value() / 100.0
+
     # ---------- Source/Cam ----------
     def on_source_changed(self, _):
         self.mode_image = (self.combo_source.currentText() == "Image")
-        if not self.mode_image and self.cap is None:
+        self.capture.set_image_mode(self.mode_image)
+        if self.mode_image and self.loaded_image is None:
+            self.view_orig.setText("Load an image…")
+            self.view_proc.setText("Load an image…")
+        if not self.mode_image and not self.capture.is_opened():
             self._open_camera(int(self.combo_cam.currentText()))
 
     def on_camera_changed(self, _):
@@ -175,78 +223,26 @@ class MainWindow(QMainWindow):
             QMessageBox.warning(self, "Load failed", "이미지를 열 수 없어요.")
             return
         self.loaded_image = img.copy()
+        self.capture.set_image(self.loaded_image)
         self.mode_image = True
+        self.capture.set_image_mode(True)
         self.combo_source.setCurrentText("Image")
 
     def _open_camera(self, index: int):
-        if self.cap: self.cap.release()
-        self.cap = cv2.VideoCapture(index, cv2.CAP_DSHOW)
-        if not self.cap.isOpened():
-            self.cap = cv2.VideoCapture(index)
-        if not self.cap.isOpened():
+        if not self.capture.open(index):
             QMessageBox.critical(self, "Camera", f"카메라 {index} 열 수 없음.")
-            self.cap = None; return
-        self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, 1280)
-        self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 720)
-        self.cap.set(cv2.CAP_PROP_FPS, 30)
-
-    # ---------- Timer loop ----------
-    def on_timer(self):
-        frame = None
-        if self.mode_image:
-            if self.loaded_image is None:
-                self.view_orig.setText("Load an image…")
-                self.view_proc.setText("Load an image…")
-                return
-            frame = self.loaded_image.copy()
-        else:
-            if not self.cap: return
-            ok, frm = self.cap.read()
-            if not ok: return
-            frame = frm
-
-        original = frame.copy()
+            return
+        self._log(self.capture.cap_info)
 
-        # sync processor with UI
-        self.processor.color_mode = self.combo_color.currentText()
-        self.processor.clahe_enabled = self.chk_clahe.isChecked()
-        self.processor.clahe_clip = self.sld_clahe.value() / 10.0
-        self.processor.blur_kind = self.combo_blur.currentText()
-        self.processor.blur_level = self.sld_blur.value()
-        self.processor.edge_kind = self.combo_edge.currentText()
-        self.processor.intensity = self.sld_intensity.value() / 100.0
+    # ---------- Frame sink (GUI thread) ----------
+    def _on_frame_ready(self, original: np.ndarray, out: np.ndarray, drowsy_active: bool):
+        self.last_frame = original
 
-        processed = self.processor.process(frame.copy(), base_for_blend=original)
-        out = processed.copy()
-
-        # detection on processed (fallback on original for edge modes)
-        if self.chk_detect.isChecked() and self.detector.mesh:
-            results = self.detector.detect(processed)
-            if (not results or not results.multi_face_landmarks) and \
-               self.processor.edge_kind in ("Canny", "Laplacian", "Sobel"):
-                results = self.detector.detect(original)
-
-            out, ear_val, _ = self.detector.draw_overlays(
-                results, out,
-                draw_eye_outline=self.chk_eye_outline.isChecked(),
-                draw_bbox=self.chk_bbox.isChecked(),
-                draw_label=self.chk_label.isChecked(),
-                ear_digits=self.spn_ear_digits.value()
-            )
-
-            if self.chk_alarm.isChecked():
-                thresh = self.sld_ear.value() / 100.0
-                turned_on, turned_off = self.drowsy.update(ear_val, thresh)
-                if turned_on:
-                    self._log(f"[{time.strftime('%Y-%m-%d %H:%M:%S')}] ALARM: Drowsy (EAR={ear_val:.3f} < {thresh:.3f})")
-                if turned_off:
-                    self._log("ALARM OFF (recovered)")
-
-                if self.drowsy.is_active():
-                    h, w = out.shape[:2]
-                    cv2.rectangle(out, (0, 0), (w, 50), (0, 0, 255), -1)
-                    cv2.putText(out, "DROWSY!", (10, 35),
-                                cv2.FONT_HERSHEY_SIMPLEX, 1.0, (255,255,255), 2, cv2.LINE_AA)
+        if drowsy_active:
+            h, w = out.shape[:2]
+            cv2.rectangle(out, (0, 0), (w, 50), (0, 0, 255), -1)
+            cv2.putText(out, "DROWSY!", (10, 35),
+                        cv2.FONT_HERSHEY_SIMPLEX, 1.0, (255,255,255), 2, cv2.LINE_AA)
 
         # show
         self._set_pixmap(self.view_orig, original)
@@ -256,14 +252,12 @@ class MainWindow(QMainWindow):
     def open_kernel_editor(self):
         dlg = KernelEditorDialog(self)
         def preview_cb(ker):
-            # grab one frame for preview
+            # 마지막으로 표시된 프레임으로 미리보기 (캡처는 CaptureWorker 소유)
             if self.mode_image and self.loaded_image is not None:
                 base = self.loaded_image.copy()
             else:
-                if not self.cap: return
-                ok, frm = self.cap.read()
-                if not ok: return
-                base = frm
+                if self.last_frame is None: return
+                base = self.last_frame
             prev = cv2.filter2D(base, -1, ker)
             self._set_pixmap(self.view_proc, prev)
         dlg.preview_callback = preview_cb
@@ -276,22 +270,56 @@ class MainWindow(QMainWindow):
 
     # ---------- Helpers ----------
     def _set_pixmap(self, label: QLabel, img: np.ndarray):
-        qimg = bgr_to_qimage(img)
-        label.setPixmap(QPixmap.fromImage(qimg).scaled(
-            label.size(), Qt.AspectRatioMode.KeepAspectRatio, Qt.TransformationMode.SmoothTransformation
-        ))
+        # 라벨 크기(비율 유지)로 cv2.resize 한 번만 → Qt 쪽 smooth scale 생략
+        h, w = img.shape[:2]
+        scale = min(label.width() / w, label.height() / h)
+        tw, th = max(1, int(w * scale)), max(1, int(h * scale))
+        if (tw, th) != (w, h):
+            shape = (th, tw) + img.shape[2:]
+            buf = self._preview_bufs.get(label)
+            if buf is None or buf.shape != shape or buf.dtype != img.dtype:
+                buf = np.empty(shape, img.dtype)
+                self._preview_bufs[label] = buf
+            interp = cv2.INTER_AREA if scale < 1.0 else cv2.INTER_LINEAR
+            img = cv2.resize(img, (tw, th), dst=buf, interpolation=interp)
+        label.setPixmap(QPixmap.fromImage(bgr_to_qimage(img)))
+
+    def _open_log_file(self):
+        try:
+            return open(self.log_path, "a", encoding="utf-8", buffering=1)
+        except OSError:
+            return None
 
     def _log(self, msg: str):
         self.log.append(msg)
-        try:
-            with open(self.log_path, "a", encoding="utf-8") as f:
-                f.write(msg + "\n")
-        except Exception:
-            pass
+        if self._log_closed:  # closeEvent 이후 도착한 시그널은 파일에 쓰지 않는다
+            return
+        if self._log_f is not None:
+            try:
+                self._log_f.write(msg + "\n")
+                return
+            except (OSError, ValueError):
+                # 핸들이 (로테이션 등으로) 깨졌으면 닫고 다시 연다
+                try:
+                    self._log_f.close()
+                except OSError:
+                    pass
+                self._log_f = None
+        self._log_f = self._open_log_file()
+        if self._log_f is not None:
+            try:
+                self._log_f.write(msg + "\n")
+            except (OSError, ValueError):
+                pass
 
     def closeEvent(self, e):
-        self.timer.stop()
-        if self.cap: self.cap.release()
+        self.capture.stop()
+        self.worker.stop()
+        self.capture.release()
         if self.detector: self.detector.close()
         self._log(f"■ Session ended at {time.strftime('%Y-%m-%d %H:%M:%S')}")
+        self._log_closed = True
+        if self._log_f:
+            self._log_f.close()
+            self._log_f = None
         super().closeEvent(e)
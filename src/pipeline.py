@@ -0,0 +1,189 @@
+from __future__ import annotations
+from typing import Optional
+import queue, threading, time
+import cv2
+import numpy as np
+from PySide6.QtCore import QThread, Signal
+
+from src.processor import VideoProcessor
+from src.detection import FaceMeshDetector, DrowsyMonitor
+
+def put_latest(q: queue.Queue, item) -> None:
+    """Bounded queue에 넣되, 가득 차면 가장 오래된 항목을 버린다 (drop-oldest)."""
+    try:
+        q.put_nowait(item)
+    except queue.Full:
+        try:
+            q.get_nowait()
+        except queue.Empty:
+            pass
+        try:
+            q.put_nowait(item)
+        except queue.Full:
+            pass
+
+class CaptureWorker(QThread):
+    """
+    캡처 스레드. cv2.VideoCapture를 소유하고 blocking read() 루프로 프레임을 큐에 넣는다.
+    Image 모드에서는 로드된 이미지를 일정 간격으로 반복 투입한다.
+    """
+    def __init__(self, frames: queue.Queue, parent=None):
+        super().__init__(parent)
+        self.frames = frames
+        self.cap: Optional[cv2.VideoCapture] = None
+        self.cap_info = ""  # 실제 적용된 fourcc/해상도/FPS (open() 후 갱신)
+        self.mode_image = False
+        self.image: Optional[np.ndarray] = None
+        self.image_interval_ms = 30
+        self._lock = threading.Lock()
+        self._running = False
+
+    def open(self, index: int) -> bool:
+        """카메라 열기 (GUI 스레드에서 호출). 실패 시 False."""
+        with self._lock:
+            if self.cap: self.cap.release()
+            cap = cv2.VideoCapture(index, cv2.CAP_DSHOW)
+            if not cap.isOpened():
+                cap = cv2.VideoCapture(index)
+            if not cap.isOpened():
+                self.cap = None
+                return False
+            # MJPEG 전송: YUYV 기본값이면 720p에서 USB 대역폭 때문에 FPS가 제한됨
+            # (fourcc는 해상도/FPS보다 먼저 설정해야 적용되는 드라이버가 많다)
+            cap.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*"MJPG"))
+            cap.set(cv2.CAP_PROP_FRAME_WIDTH, 1280)
+            cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 720)
+            cap.set(cv2.CAP_PROP_FPS, 30)
+            cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)  # 밀린 프레임으로 인한 지연 방지
+            fcc = int(cap.get(cv2.CAP_PROP_FOURCC))
+            fcc_s = "".join(chr((fcc >> 8 * i) & 0xFF) for i in range(4)) if fcc else "?"
+            self.cap_info = (f"camera {index}: {fcc_s} "
+                             f"{int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))}x{int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))} "
+                             f"@ {cap.get(cv2.CAP_PROP_FPS):.1f}fps")
+            self.cap = cap
+            return True
+
+    def is_opened(self) -> bool:
+        return self.cap is not None
+
+    def release(self):
+        with self._lock:
+            if self.cap: self.cap.release()
+            self.cap = None
+
+    def set_image_mode(self, on: bool):
+        self.mode_image = on
+
+    def set_image(self, img: Optional[np.ndarray]):
+        self.image = img
+
+    def stop(self):
+        self._running = False
+        self.wait()
+
+    def run(self):
+        self._running = True
+        while self._running:
+            if self.mode_image:
+                img = self.image
+                if img is None:
+                    self.msleep(self.image_interval_ms)
+                    continue
+                frame = img  # 읽기 전용으로만 쓰이므로 복사하지 않는다 (ProcessWorker.step 참고)
+                self.msleep(self.image_interval_ms)
+            else:
+                with self._lock:
+                    if self.cap is None:
+                        ok, frame = False, None
+                    else:
+                        ok, frame = self.cap.read()
+                if not ok:
+                    self.msleep(10)
+                    continue
+            put_latest(self.frames, frame)
+
+class ProcessWorker(QThread):
+    """
+    처리 스레드. 큐에서 프레임을 받아 VideoProcessor → FaceMeshDetector → DrowsyMonitor 순으로 실행.
+    결과는 frame_ready 시그널로 GUI 스레드에 전달한다 (QueuedConnection).
+    """
+    frame_ready = Signal(object, object, bool)  # original, processed(+overlays), drowsy active
+    log_message = Signal(str)
+
+    def __init__(self, frames: queue.Queue, processor: VideoProcessor,
+                 detector: FaceMeshDetector, drowsy: DrowsyMonitor, parent=None):
+        super().__init__(parent)
+        self.frames = frames
+        self.processor = processor
+        self.detector = detector
+        self.drowsy = drowsy
+
+        # Detection / overlay options (GUI 스레드에서 갱신)
+        self.detect_enabled = True
+        self.draw_eye_outline = True
+        self.draw_bbox = True
+        self.draw_label = True
+        self.ear_digits = 2
+        self.alarm_enabled = True
+        self.ear_thresh = 0.22
+
+        self._running = False
+
+    def stop(self):
+        self._running = False
+        self.wait()
+
+    def run(self):
+        self._running = True
+        last_error: Optional[str] = None
+        while self._running:
+            try:
+                frame = self.frames.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            try:
+                original, out, active = self.step(frame)
+            except Exception as e:
+                # 한 프레임 실패로 스레드가 끝나지 않도록 로그만 남기고 계속 (같은 오류는 한 번만)
+                msg = f"Processing error: {type(e).__name__}: {str(e).strip()}"
+                if msg != last_error:
+                    self.log_message.emit(msg)
+                    last_error = msg
+                continue
+            last_error = None
+            self.frame_ready.emit(original, out, active)
+
+    def step(self, frame: np.ndarray) -> tuple[np.ndarray, np.ndarray, bool]:
+        """프레임 1장 처리. (original, out, drowsy_active) 반환."""
+        # 버퍼 공유 규칙:
+        # - original(= frame)은 읽기 전용. 왼쪽 뷰 / 블렌드 base / fallback detect에만 쓰인다.
+        # - processor.process는 입력을 제자리에서 수정하지 않고 새 버퍼를 반환한다.
+        #   단, 아무 단계도 적용되지 않으면 입력 그대로를 반환할 수 있으므로 그때만 복사한다.
+        # - out은 이 프레임 전용 버퍼로, 오버레이/배너가 제자리에 그려진다.
+        original = frame
+        processed = self.processor.process(frame, base_for_blend=original)
+        out = processed.copy() if processed is original else processed
+
+        # detection on processed (fallback on original for edge modes)
+        if self.detect_enabled and self.detector.mesh:
+            edge = self.processor.edge_kind in ("Canny", "Laplacian", "Sobel")
+            lms = self.detector.track(processed, fallback=original if edge else None)
+
+            out, ear_val, _ = self.detector.draw_overlays(
+                lms, out,
+                draw_eye_outline=self.draw_eye_outline,
+                draw_bbox=self.draw_bbox,
+                draw_label=self.draw_label,
+                ear_digits=self.ear_digits
+            )
+
+            if self.alarm_enabled:
+                thresh = self.ear_thresh
+                turned_on, turned_off = self.drowsy.update(ear_val, thresh)
+                if turned_on:
+                    self.log_message.emit(f"[{time.strftime('%Y-%m-%d %H:%M:%S')}] ALARM: Drowsy (EAR={ear_val:.3f} < {thresh:.3f})")
+                if turned_off:
+                    self.log_message.emit("ALARM OFF (recovered)")
+                return original, out, self.drowsy.is_active()
+
+        return original, out, False
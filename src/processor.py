@@ -14,6 +14,9 @@ class VideoProcessor:
     - edge_kind: "None" | "Laplacian" | "Sobel" | "Canny" | "Unsharp" | "Custom Kernel"
     - intensity: 0..1 (base와 처리본 가중합)
     - custom_kernel: Optional[np.ndarray]
+    - use_umat: True면 cv2.UMat(OpenCL T-API)으로 처리 후 마지막에 ndarray로 되돌림
+    process()는 입력 img를 제자리에서 수정하지 않는다. 적용된 단계가 없으면 img 자체를 반환할 수 있고,
+    base_for_blend가 없으면 GRAY(2D) 결과를 그대로 반환할 수 있다.
     """
     def __init__(self):
         self.color_mode = "BGR"
@@ -24,24 +27,87 @@ class VideoProcessor:
         self.edge_kind = "None"
         self.intensity = 1.0
         self.custom_kernel: Optional[np.ndarray] = None
+        self._custom_sep: Optional[tuple] = None  # 분리 가능한 큰 커널이면 (kx, ky)
+        self.use_umat = False
+
+        # CLAHE 객체 캐시: (clipLimit, tileGridSize)가 바뀔 때만 재생성
+        self._clahe_cached = None
+        self._clahe_key = None
+
+        # Unsharp 커널 캐시: I + amount*(I - G) 를 3x3 하나로 합친 것 (amount가 바뀔 때만 재계산)
+        self._unsharp_amount = None
+        self._unsharp_kernel = None
+
+        # Sobel 작업 버퍼 (프레임 크기가 바뀔 때만 재할당)
+        self._sx = self._sy = self._mag = self._mag_u8 = None
+
+    def _sobel_buffers(self, shape):
+        if self._sx is None or self._sx.shape != shape:
+            self._sx = np.empty(shape, np.float32)
+            self._sy = np.empty(shape, np.float32)
+            self._mag = np.empty(shape, np.float32)
+            self._mag_u8 = np.empty(shape, np.uint8)
+
+    def _unsharp(self, amount: float) -> np.ndarray:
+        if amount != self._unsharp_amount:
+            g = cv2.getGaussianKernel(3, 0)
+            identity = np.zeros((3, 3), np.float64)
+            identity[1, 1] = 1.0
+            self._unsharp_kernel = ((1 + amount) * identity - amount * (g @ g.T)).astype(np.float32)
+            self._unsharp_amount = amount
+        return self._unsharp_kernel
 
     def set_custom_kernel(self, kernel: Optional[np.ndarray]):
+        # 커널은 C-contiguous FP32로 고정. OpenCV가 8U 입력용 커널을 내부에서 직접 변환하므로
+        # int16 고정소수점 + CV_16S 경로는 빠르지 않고, convertScaleAbs는 음수를 |x|로 접어 결과도 달라진다.
+        if kernel is not None:
+            kernel = np.ascontiguousarray(kernel, dtype=np.float32)
+        # 큰 커널(k*k > 121): filter2D는 이미 내부에서 DFT 기반 경로로 전환하므로
+        # 별도 FFT 구현은 이득이 없다. 대신 rank-1(분리 가능) 커널이면
+        # sepFilter2D로 픽셀당 O(k^2) → O(k).
+        sep = None
+        if kernel is not None and kernel.size > 121 and min(kernel.shape) > 1 \
+                and np.isfinite(kernel).all():  # nan/inf이면 SVD가 수렴하지 않음
+            u, sv, vt = np.linalg.svd(kernel.astype(np.float64))
+            if sv[0] > 0 and sv[1] <= 1e-6 * sv[0]:
+                r = np.sqrt(sv[0])
+                sep = ((vt[0] * r).astype(np.float32), (u[:, 0] * r).astype(np.float32))
+        self._custom_sep = sep
         self.custom_kernel = kernel
 
     def process(self, img: np.ndarray, base_for_blend: Optional[np.ndarray] = None) -> np.ndarray:
+        h, w = img.shape[:2]
+        is_gray = img.ndim == 2
+        umat = self.use_umat
+        # useOpenCL 플래그는 스레드별로 저장되므로 process()를 부르는 (워커) 스레드에서 맞춘다
+        want_ocl = umat and cv2.ocl.haveOpenCL()
+        if cv2.ocl.useOpenCL() != want_ocl:
+            cv2.ocl.setUseOpenCL(want_ocl)
+        if umat:
+            img = cv2.UMat(img)
+
         # 1) Color
-        if self.color_mode == "Grayscale":
+        if self.color_mode == "Grayscale" and not is_gray:
             img = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+            is_gray = True
 
         # 2) CLAHE
         if self.clahe_enabled:
             clip = max(0.1, float(self.clahe_clip))
-            clahe = cv2.createCLAHE(clipLimit=clip, tileGridSize=(8, 8))
-            if img.ndim == 2:
+            key = (clip, (8, 8))
+            if key != self._clahe_key:
+                self._clahe_cached = cv2.createCLAHE(clipLimit=clip, tileGridSize=(8, 8))
+                self._clahe_key = key
+            clahe = self._clahe_cached
+            if is_gray:
                 img = clahe.apply(img)
             else:
                 ycc = cv2.cvtColor(img, cv2.COLOR_BGR2YCrCb)
-                ycc[:, :, 0] = clahe.apply(ycc[:, :, 0])
+                if umat:  # UMat은 채널 슬라이싱 불가
+                    y, cr, cb = cv2.split(ycc)
+                    ycc = cv2.merge((clahe.apply(y), cr, cb))
+                else:
+                    ycc[:, :, 0] = clahe.apply(ycc[:, :, 0])
                 img = cv2.cvtColor(ycc, cv2.COLOR_YCrCb2BGR)
 
         # 3) Blur
@@ -59,42 +125,69 @@ class VideoProcessor:
 
         # 4) Edge / Sharpen / Canny / Unsharp / Custom
         if self.edge_kind != "None":
-            gray = img if img.ndim == 2 else cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+            gray = img if is_gray else cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
 
             if self.edge_kind == "Laplacian":
                 lap = cv2.Laplacian(gray, cv2.CV_16S, ksize=3)
                 lap = cv2.convertScaleAbs(lap)
-                img = lap if img.ndim == 2 else cv2.cvtColor(lap, cv2.COLOR_GRAY2BGR)
+                img, is_gray = lap, True
 
             elif self.edge_kind == "Sobel":
-                sx = cv2.Sobel(gray, cv2.CV_32F, 1, 0, ksize=3)
-                sy = cv2.Sobel(gray, cv2.CV_32F, 0, 1, ksize=3)
-                mag = cv2.magnitude(sx, sy)
-                mag = (np.clip(mag / (mag.max() + 1e-6) * 255, 0, 255)).astype(np.uint8)
-                img = mag if img.ndim == 2 else cv2.cvtColor(mag, cv2.COLOR_GRAY2BGR)
+                if umat:
+                    bx = by = bm = bu = None
+                else:
+                    self._sobel_buffers((h, w))
+                    bx, by, bm, bu = self._sx, self._sy, self._mag, self._mag_u8
+                sx = cv2.Sobel(gray, cv2.CV_32F, 1, 0, dst=bx, ksize=3)
+                sy = cv2.Sobel(gray, cv2.CV_32F, 0, 1, dst=by, ksize=3)
+                mag = cv2.magnitude(sx, sy, magnitude=bm)
+                # mag / max * 255 → uint8 를 한 번에 (NORM_INF: max를 255로 스케일)
+                mag = cv2.normalize(mag, bu, 255, 0, cv2.NORM_INF, cv2.CV_8U)
+                img, is_gray = mag, True
 
             elif self.edge_kind == "Canny":
                 t = int(self.intensity * 100)  # 0~100
                 lo = max(0, int(20 + 1.2 * t))
                 hi = max(lo + 1, int(40 + 2.0 * t))
                 edges = cv2.Canny(gray, lo, hi)
-                img = edges if img.ndim == 2 else cv2.cvtColor(edges, cv2.COLOR_GRAY2BGR)
+                img, is_gray = edges, True
 
             elif self.edge_kind == "Unsharp":
                 amount = float(self.intensity)  # 0~1
-                blur = cv2.GaussianBlur(img, (3, 3), 0)
-                img = cv2.addWeighted(img, 1 + amount, blur, -amount, 0)
+                # blur + addWeighted 두 패스 대신 filter2D 한 패스
+                img = cv2.filter2D(img, -1, self._unsharp(amount))
 
-            elif self.edge_kind == "Custom Kernel" and self.custom_kernel is not None:
-                img = cv2.filter2D(img, -1, self.custom_kernel)
+            elif self.edge_kind == "Custom Kernel":
+                # GUI 스레드가 set_custom_kernel()을 호출할 수 있으므로 한 번만 읽는다
+                # (set_custom_kernel은 _custom_sep → custom_kernel 순으로 갱신)
+                ker = self.custom_kernel
+                sep = self._custom_sep
+                if ker is not None:
+                    if sep is not None:
+                        img = cv2.sepFilter2D(img, -1, sep[0], sep[1])
+                    else:
+                        img = cv2.filter2D(img, -1, ker)
 
         # 5) Intensity blend
-        alpha = float(self.intensity)
-        if img.ndim == 2:
-            img = cv2.cvtColor(img, cv2.COLOR_GRAY2BGR)
+        # 엣지 결과는 GRAY로 유지하다가 BGR base와 섞을 때만 한 번 승격한다.
+        # alpha≈1이면 처리본 그대로, alpha≈0이면 base 그대로 → addWeighted 생략
         if base_for_blend is not None:
+            alpha = float(self.intensity)
             base = base_for_blend
-            if base.shape[:2] != img.shape[:2]:
-                base = cv2.resize(base, (img.shape[1], img.shape[0]), interpolation=cv2.INTER_LINEAR)
-            return cv2.addWeighted(base, 1.0 - alpha, img, alpha, 0.0)
-        return img
+            if base.shape[:2] != (h, w):
+                base = cv2.resize(base, (w, h), interpolation=cv2.INTER_LINEAR)
+            if alpha <= 0.001:
+                img = base
+            else:
+                # 오버레이가 컬러로 그려지므로 BGR base에 맞춰 승격은 유지
+                if is_gray and base.ndim == 3:
+                    img = cv2.cvtColor(img, cv2.COLOR_GRAY2BGR)
+                if alpha < 0.999:
+                    if umat:
+                        base = cv2.UMat(base)
+                    img = cv2.addWeighted(base, 1.0 - alpha, img, alpha, 0.0)
+
+        if isinstance(img, cv2.UMat):
+            return img.get()
+        # 재사용 버퍼는 다음 프레임에 덮어쓰이므로 밖으로 내보낼 때만 복사
+        return img.copy() if img is self._mag_u8 else img
@@ -1,5 +1,4 @@
 from __future__ import annotations
-import cv2
 import numpy as np
 from PySide6.QtGui import QImage
 
@@ -8,9 +7,10 @@ def bgr_to_qimage(img: np.ndarray) -> QImage:
     if img.ndim == 2:
         h, w = img.shape
         return QImage(img.data, w, h, w, QImage.Format.Format_Grayscale8).copy()
-    rgb = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
-    h, w, ch = rgb.shape
-    return QImage(rgb.data, w, h, ch*w, QImage.Format.Format_RGB888).copy()
+    # Qt 5.14+ Format_BGR888: BGR→RGB 변환 없이 바로 감싼다.
+    # .copy()는 유지 — 호출자가 버퍼를 재사용하므로 (MainWindow._set_pixmap)
+    h, w, ch = img.shape
+    return QImage(img.data, w, h, ch*w, QImage.Format.Format_BGR888).copy()
 
 def ensure_odd(k: int) -> int:
     """Force an odd kernel size (>=1)."""
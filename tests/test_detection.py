@@ -0,0 +1,45 @@
+import numpy as np
+import pytest
+
+from src.detection import DrowsyMonitor
+
+
+def _scalar_run(monitor: DrowsyMonitor, ears, thresh):
+    on, off = [], []
+    for e in ears:
+        a, b = monitor.update(float(e), thresh)
+        on.append(a)
+        off.append(b)
+    return np.array(on, bool), np.array(off, bool)
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_update_batch_matches_update(seed):
+    rng = np.random.default_rng(seed)
+    for _ in range(50):
+        frames_thresh = int(rng.integers(1, 6))
+        n = int(rng.integers(0, 60))
+        ears = rng.choice([0.0, 0.1, 0.3], size=n)
+        split = int(rng.integers(0, n + 1))
+
+        scalar = DrowsyMonitor(frames_thresh)
+        batch = DrowsyMonitor(frames_thresh)
+        on_ref, off_ref = _scalar_run(scalar, ears, 0.2)
+
+        # 두 번에 나눠 호출해도 state가 이어져야 한다
+        on_a, off_a = batch.update_batch(ears[:split], 0.2)
+        on_b, off_b = batch.update_batch(ears[split:], 0.2)
+
+        np.testing.assert_array_equal(np.concatenate([on_a, on_b]), on_ref)
+        np.testing.assert_array_equal(np.concatenate([off_a, off_b]), off_ref)
+        assert batch.state == scalar.state
+
+
+@pytest.mark.parametrize("ear, thresh", [(0.21999999, 0.22), (0.2999999999, 0.3)])
+def test_update_batch_threshold_precision(ear, thresh):
+    # 임계값 바로 아래 EAR: float32로 내리면 thresh 이상으로 반올림되어 알람이 켜지지 않는다
+    scalar = DrowsyMonitor(frames_thresh=1)
+    batch = DrowsyMonitor(frames_thresh=1)
+    on_ref, _ = _scalar_run(scalar, [ear], thresh)
+    on, _ = batch.update_batch([ear], thresh)
+    assert on_ref[0] and on[0]